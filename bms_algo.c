@@ -350,4 +350,33 @@ void BMS_Update(BMS_State* state, float voltage, float current, float temperatur
     }
     
     state->update_count++;
+}
+
+void BMS_UpdateBatch(BMS_State* restrict state, const float* restrict voltage, const float* restrict current,
+                     const float* restrict temperature, float dt_seconds, int n,
+                     float* restrict soc_out, float* restrict soh_out) {
+    if (state == NULL || voltage == NULL || current == NULL || temperature == NULL) return;
+
+    for (int k = 0; k < n; k++) {
+        BMS_Update(state, voltage[k], current[k], temperature[k], dt_seconds);
+
+        if (soc_out != NULL) soc_out[k] = state->soc_percent;
+        if (soh_out != NULL) soh_out[k] = state->soh_percent;
+    }
+}
+
+void BMS_GetOCVSOCBatch(const float* restrict voltage, float temperature, int n, float* restrict soc_out) {
+    if (voltage == NULL || soc_out == NULL) return;
+
+    for (int k = 0; k < n; k++) {
+        soc_out[k] = BMS_GetOCVSOC(voltage[k], temperature);
+    }
+}
+
+void BMS_GetInternalResistanceBatch(const float* restrict soc, float temp, int n, float* restrict resistance_out) {
+    if (soc == NULL || resistance_out == NULL) return;
+
+    for (int k = 0; k < n; k++) {
+        resistance_out[k] = BMS_GetInternalResistance(soc[k], temp);
+    }
 }
\ No newline at end of file
@@ -39,10 +39,14 @@ typedef struct {
 
 void BMS_Init(BMS_State* state, float initial_soc_percent, float nominal_capacity_ah);
 void BMS_Update(BMS_State* state, float voltage, float current, float temperature, float dt_seconds);
+void BMS_UpdateBatch(BMS_State* state, const float* voltage, const float* current, const float* temperature,
+                     float dt_seconds, int n, float* soc_out, float* soh_out);
 
 float BMS_GetCurrent(float adc_ch1_volts, float adc_ch2_volts);
 float BMS_GetOCVSOC(float voltage, float temperature);
 float BMS_GetInternalResistance(float soc, float temp);
+void BMS_GetOCVSOCBatch(const float* voltage, float temperature, int n, float* soc_out);
+void BMS_GetInternalResistanceBatch(const float* soc, float temp, int n, float* resistance_out);
 float BMS_BilinearInterpolate(float x, float y, const float* x_axis, const float* y_axis, 
                               const float* table, int x_size, int y_size);
 